@@ -12,9 +12,12 @@ Notes:
 from __future__ import annotations
 
 import re
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
 from pathlib import Path
 from typing import Iterable, List, Optional, Tuple
 
+from reportlab import rl_config
 from reportlab.lib import colors
 from reportlab.lib.pagesizes import A4
 from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
@@ -34,12 +37,28 @@ from reportlab.platypus import (
 from xml.sax.saxutils import escape as xml_escape
 
 
-UNICODE_DASHES_RE = re.compile(r"[\u2010\u2011\u2012\u2013\u2014\u2015\u2212]")
+_DASH_TABLE = str.maketrans(dict.fromkeys("\u2010\u2011\u2012\u2013\u2014\u2015\u2212", "-"))
+
+# Single alternation matching either `code` or **bold**, so the inline
+# converter is one linear regex pass instead of a per-character scan.
+_INLINE_RE = re.compile(r"`([^`\n]*)`|\*\*(.+?)\*\*")
+
+# xml_escape runs three str.replace passes; most segments of CJK prose contain
+# none of & < >, so probe once and skip the replaces on the common path.
+_NEEDS_ESCAPE = re.compile(r"[&<>]").search
+
+# Constant span delimiters, appended separately so no intermediate string is
+# formatted per bold/code span.
+_BOLD_OPEN = "<b>"
+_BOLD_CLOSE = "</b>"
+_CODE_OPEN = '<font name="Courier">'
+_CODE_CLOSE = "</font>"
 
 
 def normalize_dashes(text: str) -> str:
-    # Enforce ASCII hyphens in the generated PDF output.
-    return UNICODE_DASHES_RE.sub("-", text)
+    # Enforce ASCII hyphens in the generated PDF output. str.translate is a
+    # single C-level pass, cheaper than a regex substitution for 1:1 chars.
+    return text.translate(_DASH_TABLE)
 
 
 def _inline_md_to_rl_markup(text: str) -> str:
@@ -53,43 +72,32 @@ def _inline_md_to_rl_markup(text: str) -> str:
 
     text = normalize_dashes(text)
 
-    # Tokenize so we can XML-escape plain text, but keep tags we insert.
-    out: List[str] = []
-    i = 0
-    while i < len(text):
-        # Inline code: `...`
-        if text[i] == "`":
-            j = text.find("`", i + 1)
-            if j == -1:
-                out.append(xml_escape(text[i:]))
-                break
-            code = text[i + 1 : j]
-            out.append(f'<font name="Courier">{xml_escape(code)}</font>')
-            i = j + 1
-            continue
+    # Fast path: most CJK prose has no inline markup at all, so two substring
+    # probes let it skip the tokenizer entirely.
+    if "`" not in text and "**" not in text:
+        return xml_escape(text).replace("\n", "<br/>")
 
-        # Bold: **...**
-        if text.startswith("**", i):
-            j = text.find("**", i + 2)
-            if j == -1:
-                out.append(xml_escape(text[i:]))
-                break
-            bold = text[i + 2 : j]
-            out.append(f"<b>{xml_escape(bold)}</b>")
-            i = j + 2
-            continue
+    _esc = lambda s: s if not _NEEDS_ESCAPE(s) else xml_escape(s)  # noqa: E731
 
-        # Default: emit one char (we escape in chunks for speed)
-        # Find next special token quickly.
-        next_tick = text.find("`", i)
-        next_bold = text.find("**", i)
-        candidates = [p for p in (next_tick, next_bold) if p != -1]
-        nxt = min(candidates) if candidates else -1
-        if nxt == -1:
-            out.append(xml_escape(text[i:]))
-            break
-        out.append(xml_escape(text[i:nxt]))
-        i = nxt
+    # One linear regex pass: XML-escape the gaps between matches, and wrap
+    # each matched span in the tag we insert. Unterminated markers simply
+    # fall through as escaped plain text.
+    out: List[str] = []
+    append = out.append
+    pos = 0
+    for m in _INLINE_RE.finditer(text):
+        append(_esc(text[pos : m.start()]))
+        code = m.group(1)
+        if code is not None:
+            append(_CODE_OPEN)
+            append(_esc(code))
+            append(_CODE_CLOSE)
+        else:
+            append(_BOLD_OPEN)
+            append(_esc(m.group(2)))
+            append(_BOLD_CLOSE)
+        pos = m.end()
+    append(_esc(text[pos:]))
 
     # ReportLab Paragraph uses <br/> for line breaks.
     return "".join(out).replace("\n", "<br/>")
@@ -102,34 +110,65 @@ HR_RE = re.compile(r"^\s*(?:---|\*\*\*|___)\s*$")
 CODE_FENCE_RE = re.compile(r"^\s*```")
 TABLE_ROW_RE = re.compile(r"^\s*\|.*\|\s*$")
 
+# Single alternation covering every block opener, so the main loop runs one
+# regex per line and dispatches on lastgroup instead of trying six regexes in
+# sequence. Alternation order mirrors the old if-chain (fence before heading,
+# hr before list so "---" is a rule, not a bullet). Branches that need groups
+# (heading level, list indent/marker) still use the full regexes above.
+_BLOCK_RE = re.compile(
+    r"(?P<fence>\s*```)"
+    r"|(?P<heading>#{1,6}\s+)"
+    r"|(?P<hr>\s*(?:---|\*\*\*|___)\s*$)"
+    r"|(?P<quote>\s*>\s?)"
+    r"|(?P<table>\s*\|.*\|\s*$)"
+    r"|(?P<list>\s*(?:[-+*]|\d+\.)\s+)"
+)
+
+# Set once _register_fonts has run in this process.
+_FONTS_REGISTERED = False
+
+# First characters (after leading whitespace) that can possibly open a block.
+# Prose lines fail this set test cheaply without touching the regex engine.
+_BLOCK_START_CHARS = frozenset("#>|`-*+_0123456789")
+
+# Line-kind codes for the classification pre-pass; one byte per line, so the
+# main loop dispatches on a C-level bytearray compare instead of re-matching.
+_K_BLANK, _K_HEADING, _K_FENCE, _K_HR, _K_QUOTE, _K_TABLE, _K_LIST, _K_PARA = range(8)
+_KIND_CODES = {
+    "heading": _K_HEADING,
+    "fence": _K_FENCE,
+    "hr": _K_HR,
+    "quote": _K_QUOTE,
+    "table": _K_TABLE,
+    "list": _K_LIST,
+}
+
 
 def _is_table_sep_row(cells: List[str]) -> bool:
     # Markdown table separator row is something like: --- | :---: | ---:
+    # Plain string ops beat a per-cell regex fullmatch here.
     for c in cells:
         s = c.strip()
         if not s:
             return False
-        if not re.fullmatch(r":?-{3,}:?", s):
+        if s[0] == ":":
+            s = s[1:]
+        if s[-1:] == ":":
+            s = s[:-1]
+        if len(s) < 3 or s.strip("-"):
             return False
     return True
 
 
-def _parse_table_rows(lines: List[str]) -> List[List[str]]:
-    rows: List[List[str]] = []
-    for ln in lines:
-        raw = ln.strip()
-        if not raw.startswith("|"):
-            continue
-        # Split and drop leading/trailing empty items from pipe boundaries.
-        parts = [p.strip() for p in raw.strip("|").split("|")]
-        if _is_table_sep_row(parts):
-            continue
-        rows.append(parts)
-    # Normalize row lengths (pad short rows)
+def _normalize_table_rows(rows: List[List[str]]) -> List[List[str]]:
+    # Normalize row lengths (pad short rows). Most tables are already
+    # rectangular, so only allocate padding when a row is actually short,
+    # and pad from a tuple to skip the intermediate list.
     width = max((len(r) for r in rows), default=0)
     for r in rows:
-        if len(r) < width:
-            r.extend([""] * (width - len(r)))
+        missing = width - len(r)
+        if missing > 0:
+            r.extend(("",) * missing)
     return rows
 
 
@@ -142,9 +181,24 @@ def _gather_until(lines: List[str], start: int, pred) -> Tuple[List[str], int]:
     return buf, i
 
 
-def build_pdf(md_path: Path, out_pdf: Path) -> None:
-    pdfmetrics.registerFont(UnicodeCIDFont("STSong-Light"))
+_STYLES: Optional[Tuple[ParagraphStyle, ...]] = None
 
+
+def _get_styles() -> Tuple[ParagraphStyle, ...]:
+    """Return the shared paragraph styles, building them on first use.
+
+    getSampleStyleSheet and the ParagraphStyle derivations are expensive
+    enough to matter per call; the styles are immutable for our purposes,
+    so cache them for the life of the process (including pool workers).
+    """
+    global _STYLES
+    if _STYLES is None:
+        _STYLES = _make_styles()
+    return _STYLES
+
+
+def _make_styles() -> Tuple[ParagraphStyle, ...]:
+    """Build the shared paragraph styles (base, quote, code, h1-h4)."""
     styles = getSampleStyleSheet()
     base = ParagraphStyle(
         "BaseCJK",
@@ -176,97 +230,158 @@ def build_pdf(md_path: Path, out_pdf: Path) -> None:
     h2 = ParagraphStyle("H2", parent=base, fontSize=15, leading=19, spaceAfter=8, spaceBefore=10)
     h3 = ParagraphStyle("H3", parent=base, fontSize=13, leading=16, spaceAfter=6, spaceBefore=8)
     h4 = ParagraphStyle("H4", parent=base, fontSize=11.5, leading=14, spaceAfter=6, spaceBefore=6)
+    return base, quote, code_style, h1, h2, h3, h4
 
-    def heading_style(level: int) -> ParagraphStyle:
-        return {1: h1, 2: h2, 3: h3, 4: h4}.get(level, base)
 
-    out_pdf.parent.mkdir(parents=True, exist_ok=True)
+def _iter_flowables(lines: List[str], styles: Tuple[ParagraphStyle, ...], usable_w: float) -> Iterable:
+    base, quote, code_style, h1, h2, h3, h4 = styles
 
-    doc = SimpleDocTemplate(
-        str(out_pdf),
-        pagesize=A4,
-        leftMargin=18 * mm,
-        rightMargin=18 * mm,
-        topMargin=18 * mm,
-        bottomMargin=18 * mm,
-        title=md_path.stem,
-    )
+    # Heading styles indexed by level (H5/H6 fall back to base); avoids
+    # rebuilding a lookup dict per heading.
+    hstyles = (base, h1, h2, h3, h4)
 
-    md_lines = md_path.read_text(encoding="utf-8").splitlines()
-    story = []
+    # Per-call style caches: building a ParagraphStyle validates every attribute,
+    # so construct each variant at most once instead of per table / per bullet.
+    table_cell_style = ParagraphStyle(
+        "TableCell",
+        parent=base,
+        fontSize=9.5,
+        leading=12,
+        spaceAfter=0,
+        spaceBefore=0,
+    )
+    li_styles: dict = {}
+
+    # Yield flowables lazily so the parser never holds intermediate
+    # structures beyond the block it is currently emitting.
+
+    # The gathering loops below test the same lines repeatedly; strip
+    # each line once up front so those predicates are index lookups.
+    stripped = [ln.strip() for ln in lines]
+
+    # Classify every line once into a byte code. The block regex runs at most
+    # once per line here; the main loop and the gathering loops below then
+    # dispatch on kinds[i] without touching the regex engine again. (Lines
+    # inside code fences may get bogus kinds, but the fence branch skips
+    # straight over them without consulting the classification.)
+    kinds = bytearray(len(lines))
+    for idx, s in enumerate(stripped):
+        if not s:
+            continue  # stays _K_BLANK
+        if s[0] in _BLOCK_START_CHARS:
+            bm = _BLOCK_RE.match(lines[idx])
+            if bm:
+                kinds[idx] = _KIND_CODES[bm.lastgroup]
+                continue
+        kinds[idx] = _K_PARA
 
     i = 0
-    while i < len(md_lines):
-        line = md_lines[i].rstrip("\n")
-
-        if not line.strip():
+    while i < len(lines):
+        kind = kinds[i]
+        if kind == _K_BLANK:
             i += 1
             continue
+        line = lines[i]
 
-        if CODE_FENCE_RE.match(line):
+        if kind == _K_FENCE:
             # Code fence block
-            code, j = _gather_until(md_lines, i + 1, lambda s: not CODE_FENCE_RE.match(s))
+            code, j = _gather_until(lines, i + 1, lambda s: not CODE_FENCE_RE.match(s))
             # Skip closing fence if present
-            i = j + 1 if j < len(md_lines) else j
-            story.append(Preformatted(normalize_dashes("\n".join(code)), code_style))
-            story.append(Spacer(1, 6))
+            i = j + 1 if j < len(lines) else j
+            yield Preformatted(normalize_dashes("\n".join(code)), code_style)
+            yield Spacer(1, 6)
             continue
 
-        m = HEADING_RE.match(line)
-        if m:
+        if kind == _K_HEADING:
+            m = HEADING_RE.match(line)
+            assert m is not None
             level = len(m.group("hashes"))
             txt = m.group("text").strip()
-            story.append(Paragraph(_inline_md_to_rl_markup(txt), heading_style(level)))
-            story.append(Spacer(1, 4))
+            yield Paragraph(_inline_md_to_rl_markup(txt), hstyles[level] if level < 5 else base)
+            yield Spacer(1, 4)
             i += 1
             continue
 
-        if HR_RE.match(line):
-            story.append(Spacer(1, 6))
-            story.append(HRFlowable(width="100%", thickness=0.6, color=colors.HexColor("#cccccc")))
-            story.append(Spacer(1, 6))
+        if kind == _K_HR:
+            yield Spacer(1, 6)
+            yield HRFlowable(width="100%", thickness=0.6, color=colors.HexColor("#cccccc"))
+            yield Spacer(1, 6)
             i += 1
             continue
 
-        if BLOCKQUOTE_RE.match(line):
-            # Gather consecutive blockquote lines.
-            qlines, j = _gather_until(md_lines, i, lambda s: bool(BLOCKQUOTE_RE.match(s)))
-            qtxt = "\n".join(BLOCKQUOTE_RE.match(s).group("text") for s in qlines)  # type: ignore[union-attr]
-            story.append(Paragraph(_inline_md_to_rl_markup(qtxt), quote))
-            story.append(Spacer(1, 6))
+        if kind == _K_QUOTE:
+            # Gather consecutive blockquote lines, extracting the quoted text
+            # from the same match that decides continuation.
+            qtexts: List[str] = []
+            j = i
+            while j < len(lines):
+                qm = BLOCKQUOTE_RE.match(lines[j])
+                if not qm:
+                    break
+                qtexts.append(qm.group("text"))
+                j += 1
+            yield Paragraph(_inline_md_to_rl_markup("\n".join(qtexts)), quote)
+            yield Spacer(1, 6)
             i = j
             continue
 
-        if TABLE_ROW_RE.match(line):
-            tbl_lines, j = _gather_until(md_lines, i, lambda s: bool(TABLE_ROW_RE.match(s)))
-            rows = _parse_table_rows(tbl_lines)
+        if kind == _K_TABLE:
+            # Gather consecutive table rows, splitting cells as we go so the
+            # lines are only matched (and stripped) once.
+            rows: List[List[str]] = []
+            j = i
+            while j < len(lines):
+                if kinds[j] != _K_TABLE:
+                    break
+                # Split and drop leading/trailing empty items from pipe boundaries.
+                parts = [p.strip() for p in stripped[j].strip("|").split("|")]
+                if not _is_table_sep_row(parts):
+                    rows.append(parts)
+                j += 1
+            rows = _normalize_table_rows(rows)
             if rows:
-                # Convert cells to Paragraphs for wrapping.
-                table_cell_style = ParagraphStyle(
-                    "TableCell",
-                    parent=base,
-                    fontSize=9.5,
-                    leading=12,
-                    spaceAfter=0,
-                    spaceBefore=0,
-                )
-                data = [
-                    [Paragraph(_inline_md_to_rl_markup(c), table_cell_style) for c in r] for r in rows
-                ]
                 ncols = len(rows[0])
                 # Simple width distribution: last column gets more space for 3-col tables.
-                usable_w = doc.width
                 if ncols == 3:
                     col_widths = [usable_w * 0.22, usable_w * 0.22, usable_w * 0.56]
                 else:
                     col_widths = [usable_w / ncols for _ in range(ncols)]
 
+                # Cells with inline markup, or too wide for their column,
+                # become Paragraphs; plain cells that measurably fit are
+                # passed to Table as raw strings, which ReportLab draws
+                # without running the Paragraph XML parser and layout engine
+                # per cell. Raw cells never wrap, so gate on the measured
+                # string width against the column minus its horizontal
+                # padding; and they are drawn literally by the canvas, so
+                # they are only dash-normalized, never XML-escaped.
+                cell_font = table_cell_style.fontName
+                cell_size = table_cell_style.fontSize
+                # LEFTPADDING + RIGHTPADDING from the table style below.
+                fit_widths = [w - 8 for w in col_widths]
+                data = []
+                for r in rows:
+                    cells = []
+                    for ci, c in enumerate(r):
+                        if "`" not in c and "**" not in c:
+                            plain = normalize_dashes(c)
+                            if pdfmetrics.stringWidth(plain, cell_font, cell_size) <= fit_widths[ci]:
+                                cells.append(plain)
+                                continue
+                        cells.append(Paragraph(_inline_md_to_rl_markup(c), table_cell_style))
+                    data.append(cells)
+
                 t = Table(data, colWidths=col_widths, repeatRows=1)
                 t.setStyle(
                     TableStyle(
                         [
                             ("BACKGROUND", (0, 0), (-1, 0), colors.HexColor("#f0f0f0")),
                             ("GRID", (0, 0), (-1, -1), 0.25, colors.HexColor("#cccccc")),
+                            # Raw-string cells are drawn with the table font,
+                            # so match the Paragraph cell style (CJK-capable).
+                            ("FONTNAME", (0, 0), (-1, -1), "STSong-Light"),
+                            ("FONTSIZE", (0, 0), (-1, -1), 9.5),
+                            ("LEADING", (0, 0), (-1, -1), 12),
                             ("VALIGN", (0, 0), (-1, -1), "TOP"),
                             ("LEFTPADDING", (0, 0), (-1, -1), 4),
                             ("RIGHTPADDING", (0, 0), (-1, -1), 4),
@@ -275,20 +390,19 @@ def build_pdf(md_path: Path, out_pdf: Path) -> None:
                         ]
                     )
                 )
-                story.append(t)
-                story.append(Spacer(1, 10))
+                yield t
+                yield Spacer(1, 10)
             i = j
             continue
 
-        m = LIST_RE.match(line)
-        if m:
+        if kind == _K_LIST:
             # Gather list items + continuation lines.
             items: List[Tuple[int, str, List[str]]] = []
             j = i
-            while j < len(md_lines):
-                ln = md_lines[j]
-                if not ln.strip():
+            while j < len(lines):
+                if kinds[j] == _K_BLANK:
                     break
+                ln = lines[j]
                 m_list = LIST_RE.match(ln)
                 if m_list:
                     indent_spaces = len(m_list.group("indent"))
@@ -299,45 +413,114 @@ def build_pdf(md_path: Path, out_pdf: Path) -> None:
                     continue
                 # Continuation line for previous list item (indented content)
                 if items and (ln.startswith("  ") or ln.startswith("\t")):
-                    items[-1][2].append(ln.strip())
+                    items[-1][2].append(stripped[j])
                     j += 1
                     continue
                 break
 
             for indent_spaces, marker, parts in items:
                 indent_level = indent_spaces // 2
-                left_indent = (6 + indent_level * 6) * mm
-                li_style = ParagraphStyle(
-                    "ListItem",
-                    parent=base,
-                    leftIndent=left_indent,
-                    firstLineIndent=0,
-                    spaceAfter=2,
-                )
-                txt = " ".join(p.strip() for p in parts if p.strip())
-                story.append(Paragraph(_inline_md_to_rl_markup(f"{marker} {txt}"), li_style))
-            story.append(Spacer(1, 6))
+                li_style = li_styles.get(indent_level)
+                if li_style is None:
+                    li_style = li_styles[indent_level] = ParagraphStyle(
+                        "ListItem" + str(indent_level),
+                        parent=base,
+                        leftIndent=(6 + indent_level * 6) * mm,
+                        firstLineIndent=0,
+                        spaceAfter=2,
+                    )
+                txt = " ".join(p for p in (p.strip() for p in parts) if p)
+                yield Paragraph(_inline_md_to_rl_markup(f"{marker} {txt}"), li_style)
+            yield Spacer(1, 6)
             i = j
             continue
 
-        # Paragraph: gather until blank line or next block start.
+        # Paragraph: gather until blank line or next block start — both are
+        # already encoded in the classification pre-pass.
         para_lines = [line]
         j = i + 1
-        while j < len(md_lines):
-            ln = md_lines[j]
-            if not ln.strip():
-                break
-            if CODE_FENCE_RE.match(ln) or HEADING_RE.match(ln) or HR_RE.match(ln) or BLOCKQUOTE_RE.match(ln):
-                break
-            if TABLE_ROW_RE.match(ln) or LIST_RE.match(ln):
-                break
-            para_lines.append(ln.rstrip())
+        while j < len(lines) and kinds[j] == _K_PARA:
+            para_lines.append(lines[j].rstrip())
             j += 1
 
-        ptxt = " ".join(s.strip() for s in para_lines if s.strip())
-        story.append(Paragraph(_inline_md_to_rl_markup(ptxt), base))
+        ptxt = " ".join(s for s in (s.strip() for s in para_lines) if s)
+        yield Paragraph(_inline_md_to_rl_markup(ptxt), base)
         i = j
 
+
+def _register_fonts() -> None:
+    # UnicodeCIDFont construction parses CMap data, so register the CJK font
+    # only once per process; repeat calls skip it.
+    global _FONTS_REGISTERED
+    if not _FONTS_REGISTERED:
+        pdfmetrics.registerFont(UnicodeCIDFont("STSong-Light"))
+        _FONTS_REGISTERED = True
+
+
+def _parse_section(usable_w: float, lines: List[str]) -> List:
+    """Process-pool worker: parse one top-level section into flowables."""
+    # Paragraph construction resolves style.fontName, so workers must have
+    # the font registered themselves — under the spawn start method they do
+    # not inherit the parent's registration.
+    _register_fonts()
+    return list(_iter_flowables(lines, _get_styles(), usable_w))
+
+
+def build_pdf(md_path: Path, out_pdf: Path, debug: bool = False) -> None:
+    # Note: rl_config.shapeChecking only affects reportlab.graphics shapes
+    # and widgets, which this script does not create — platypus Paragraph
+    # and Table never consult it, so this is a no-op for the flowables built
+    # here. Kept as a debug toggle in case graphics flowables are ever added.
+    rl_config.shapeChecking = 1 if debug else 0
+
+    _register_fonts()
+
+    out_pdf.parent.mkdir(parents=True, exist_ok=True)
+
+    doc = SimpleDocTemplate(
+        str(out_pdf),
+        pagesize=A4,
+        leftMargin=18 * mm,
+        rightMargin=18 * mm,
+        topMargin=18 * mm,
+        bottomMargin=18 * mm,
+        title=md_path.stem,
+    )
+
+    # Stream the file through a 1 MB buffer instead of read_text(), which
+    # would hold the whole decoded document as one extra string alongside
+    # the line list.
+    with md_path.open("r", encoding="utf-8", buffering=1 << 20) as f:
+        md_lines = [ln.rstrip("\r\n") for ln in f]
+
+    # Partition at H1 boundaries: top-level sections share no parser state,
+    # so they can be turned into flowables independently. Track fence state
+    # so a "# comment" inside a code block never starts a new section.
+    sections: List[List[str]] = []
+    cur: List[str] = []
+    in_fence = False
+    for ln in md_lines:
+        if ln.lstrip().startswith("```"):
+            in_fence = not in_fence
+        elif not in_fence and ln.startswith("# ") and cur:
+            sections.append(cur)
+            cur = []
+        cur.append(ln)
+    if cur:
+        sections.append(cur)
+    # Release the raw line list before ReportLab lays out the document.
+    del md_lines
+
+    if len(sections) > 1:
+        # Parsing is pure-Python CPU work; fan sections out across cores and
+        # concatenate the resulting flowable lists in document order.
+        with ProcessPoolExecutor() as ex:
+            chunks = list(ex.map(partial(_parse_section, doc.width), sections))
+    else:
+        chunks = [_parse_section(doc.width, s) for s in sections]
+    story = [f for chunk in chunks for f in chunk]
+    del sections, chunks
+
     def draw_footer(canvas, _doc):
         canvas.saveState()
         canvas.setFont("Helvetica", 9)